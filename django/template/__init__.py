@@ -48,7 +48,6 @@ Shared:
 
 # Multiple Template Engines
 
-from .engine import Engine
 from .utils import EngineHandler
 
 engines = EngineHandler()
@@ -58,18 +57,39 @@ __all__ = ('Engine', 'engines')
 
 # Django Template Language
 
-# Public exceptions
-from .base import VariableDoesNotExist                                  # NOQA isort:skip
-from .context import ContextPopException                                # NOQA isort:skip
-from .exceptions import TemplateDoesNotExist, TemplateSyntaxError       # NOQA isort:skip
+# Everything below used to be imported eagerly, which compiled the whole
+# lexer/parser machinery (and its large regex tables) on every
+# ``import django.template`` even when only ``engines`` was needed. Resolve
+# these names lazily instead (PEP 562) and cache them in the module globals
+# on first access.
+_LAZY_IMPORTS = {
+    'Engine': 'django.template.engine',
+    # Public exceptions
+    'VariableDoesNotExist': 'django.template.base',
+    'ContextPopException': 'django.template.context',
+    'TemplateDoesNotExist': 'django.template.exceptions',
+    'TemplateSyntaxError': 'django.template.exceptions',
+    # Template parts
+    'Context': 'django.template.base',
+    'Node': 'django.template.base',
+    'NodeList': 'django.template.base',
+    'Origin': 'django.template.base',
+    'RequestContext': 'django.template.base',
+    'Template': 'django.template.base',
+    'Variable': 'django.template.base',
+    # Library management
+    'Library': 'django.template.library',
+}
 
-# Template parts
-from .base import (                                                     # NOQA isort:skip
-    Context, Node, NodeList, Origin, RequestContext, Template, Variable,
-)
-
-# Library management
-from .library import Library                                            # NOQA isort:skip
+__all__ += ('Template', 'Context', 'RequestContext')
 
 
-__all__ += ('Template', 'Context', 'RequestContext')
+def __getattr__(name):
+    try:
+        module_path = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    from importlib import import_module
+    value = getattr(import_module(module_path), name)
+    globals()[name] = value
+    return value
@@ -9,18 +9,38 @@ from copy import copy
 # Hard-coded processor for easier use of CSRF protection.
 _builtin_context_processors = ('django.template.context_processors.csrf',)
 
+# Sentinel recorded in a frame's shadow when a key didn't exist before the
+# frame was pushed (as opposed to being overridden).
+_missing = object()
+
 
 class ContextPopException(Exception):
     "pop() has been called more times than push()"
     pass
 
 
+class _PopOnExit:
+    """push_dict() 返回的轻量上下文管理器 退出时弹栈"""
+    __slots__ = ('context',)
+
+    def __init__(self, context):
+        self.context = context
+
+    def __enter__(self):
+        return self.context
+
+    def __exit__(self, *args, **kwargs):
+        self.context.pop()
+
+
 class ContextDict(dict):
     """实现了上下文管理器的字典"""
+    __slots__ = ('context',)
+
     def __init__(self, context, *args, **kwargs):
         super().__init__(*args, **kwargs) # 这里把**kwargs转换成了字典
 
-        context.dicts.append(self) #加给了自己
+        context._push_frame(self) #加给了自己
         self.context = context # 本质上是字典列表
 
     def __enter__(self):
@@ -31,7 +51,15 @@ class ContextDict(dict):
 
 
 class BaseContext:
-    """一个表现的像字典的字典列表"""
+    """
+    一个表现的像字典的字典列表
+
+    Besides the ``dicts`` stack itself, a flattened view ``_flat`` is kept up
+    to date on every push/pop/set/delete, so that key lookups are a single
+    dict probe instead of a scan over the whole stack. ``_shadow[i]`` records,
+    for every key frame ``i`` brought in, the value it hid (or ``_missing``),
+    which is what pop() uses to restore the view.
+    """
     def __init__(self, dict_=None):
         self._reset_dicts(dict_)
 
@@ -40,10 +68,41 @@ class BaseContext:
         self.dicts = [builtins]
         if value is not None:
             self.dicts.append(value)
+        self._rebuild_flat()
+
+    def _rebuild_flat(self):
+        """从 self.dicts 重新计算碾平视图（直接替换了某一层时用）"""
+        flat = {}
+        shadows = []
+        for d in self.dicts:
+            shadow = {}
+            get = flat.get
+            for key, value in d.items():
+                shadow[key] = get(key, _missing)
+                flat[key] = value
+            shadows.append(shadow)
+        self._flat = flat
+        self._shadow = shadows
+
+    def _push_frame(self, d):
+        """把一层字典压栈并把它的键合并进碾平视图"""
+        flat = self._flat
+        get = flat.get
+        shadow = {}
+        for key, value in d.items():
+            shadow[key] = get(key, _missing)
+            flat[key] = value
+        self._shadow.append(shadow)
+        self.dicts.append(d)
 
     def __copy__(self):
         duplicate = copy(super())
         duplicate.dicts = self.dicts[:]
+        # The frame dicts are shared with the original (as before), but the
+        # bookkeeping must be per-instance so pushes on one copy don't
+        # corrupt the other's view.
+        duplicate._flat = dict(self._flat)
+        duplicate._shadow = [dict(s) for s in self._shadow]
         return duplicate
 
     def __repr__(self):
@@ -53,6 +112,11 @@ class BaseContext:
         return reversed(self.dicts)
 
     def push(self, *args, **kwargs):
+        if not args:
+            # 最常见的情况（{% block %}/{% with %} 等）不用做参数解包
+            return ContextDict(self, **kwargs)
+        if len(args) == 1 and not isinstance(args[0], BaseContext):
+            return ContextDict(self, args[0], **kwargs)
         dicts = []
         for d in args:
             if isinstance(d, BaseContext):
@@ -63,15 +127,36 @@ class BaseContext:
         # 并且返回的 self
         return ContextDict(self, *dicts, **kwargs)
 
+    def push_dict(self, d):
+        """
+        直接把 d 压栈 不经过 ContextDict 的复制
+        Fast-path push for callers that own ``d``: the dict itself becomes
+        the new frame (later __setitem__ calls on the context mutate it),
+        and only a slim pop-on-exit manager is allocated.
+        """
+        self._push_frame(d)
+        return _PopOnExit(self)
+
     def pop(self):
         if len(self.dicts) == 1:
             raise ContextPopException
+        # 弹出一层 并用 shadow 记录的旧值恢复碾平视图
+        flat = self._flat
+        for key, prior in self._shadow.pop().items():
+            if prior is _missing:
+                del flat[key]
+            else:
+                flat[key] = prior
         return self.dicts.pop()
 
     def __setitem__(self, key, value):
         # 修改当前上下文的值
         "Set a variable in the current context"
+        shadow = self._shadow[-1]
+        if key not in shadow:
+            shadow[key] = self._flat.get(key, _missing)
         self.dicts[-1][key] = value
+        self._flat[key] = value
 
     def set_upward(self, key, value):
         """
@@ -79,34 +164,35 @@ class BaseContext:
         Set a variable in one of the higher contexts if it exists there,
         otherwise in the current context.
         """
-        context = self.dicts[-1]
         for d in reversed(self.dicts):
             if key in d:
-                context = d
-                break
-        context[key] = value
+                # The topmost frame holding the key also owns its visible
+                # value, so the flat view follows the write.
+                d[key] = value
+                self._flat[key] = value
+                return
+        self[key] = value
 
     def __getitem__(self, key):
-        # 当前往上查找 d[key]
+        # 当前往上查找 d[key] 碾平视图已经做过这件事了
         "Get a variable's value, starting at the current context and going upward"
-        for d in reversed(self.dicts):
-            if key in d:
-                return d[key]
-        raise KeyError(key)
+        return self._flat[key]
 
     def __delitem__(self, key):
         # 删除当前上下文里的键
         "Delete a variable from the current context"
         del self.dicts[-1][key]
+        prior = self._shadow[-1].pop(key, _missing)
+        if prior is _missing:
+            del self._flat[key]
+        else:
+            self._flat[key] = prior
 
     def __contains__(self, key):
-        return any(key in d for d in self.dicts)
+        return key in self._flat
 
     def get(self, key, otherwise=None):
-        for d in reversed(self.dicts):
-            if key in d:
-                return d[key]
-        return otherwise
+        return self._flat.get(key, otherwise)
 
     def setdefault(self, key, default=None):
         try:
@@ -129,10 +215,12 @@ class BaseContext:
         碾平字典列表返回单个字典
         Return self.dicts as one dictionary.
         """
-        flat = {}
-        for d in self.dicts:
-            flat.update(d)
-        return flat
+        # The flattened view is maintained incrementally on push/pop and on
+        # item writes, so this is one dict copy rather than a rebuild from
+        # every frame. The copy itself stays: flatten() is public API and
+        # callers (e.g. the test client's context introspection) may mutate
+        # what they get back.
+        return dict(self._flat)
 
     def __eq__(self, other):
         """
@@ -141,8 +229,10 @@ class BaseContext:
         return (
             isinstance(other, BaseContext) and
             # because dictionaries can be put in different order
-            # we have to flatten them like in templates
-            self.flatten() == other.flatten()
+            # we have to flatten them like in templates -- the maintained
+            # flat views compare directly, without the defensive copies
+            # flatten() hands out.
+            self._flat == other._flat
         )
 
 
@@ -201,6 +291,25 @@ class RenderContext(BaseContext):
     """
     template = None
 
+    # Every accessor below touches only the top frame, so the flattened-view
+    # bookkeeping BaseContext does on push/pop and writes is pure overhead
+    # here; override the mutators with plain stack operations. The dicts
+    # list itself stays -- IncludeNode caches templates in dicts[0].
+
+    def _push_frame(self, d):
+        self.dicts.append(d)
+
+    def pop(self):
+        if len(self.dicts) == 1:
+            raise ContextPopException
+        return self.dicts.pop()
+
+    def __setitem__(self, key, value):
+        self.dicts[-1][key] = value
+
+    def __delitem__(self, key):
+        del self.dicts[-1][key]
+
     def __iter__(self):
         yield from self.dicts[-1]
 
@@ -213,12 +322,26 @@ class RenderContext(BaseContext):
     def __getitem__(self, key):
         return self.dicts[-1][key]
 
+    def flatten(self):
+        # The maintained _flat view isn't updated by the overrides above;
+        # rebuild from the frames on the rare occasions this is wanted.
+        flat = {}
+        for d in self.dicts:
+            flat.update(d)
+        return flat
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, BaseContext) and
+            self.flatten() == other.flatten()
+        )
+
     @contextmanager
     def push_state(self, template, isolated_context=True):
         initial = self.template
         self.template = template
         if isolated_context:
-            self.push()
+            self._push_frame({})
         try:
             yield
         finally:
@@ -241,11 +364,14 @@ class RequestContext(Context):
         self._processors_index = len(self.dicts)
 
         # placeholder for context processors output
-        self.update({})
+        self._push_frame({})
 
         # empty dict for any new modifications
         # (so that context processors don't overwrite them)
-        self.update({})
+        # Both frames are plain dicts pushed directly: update() would wrap
+        # each in a ContextDict (an extra allocation plus a dict copy) per
+        # request for frames that bind_template() overwrites anyway.
+        self._push_frame({})
 
     @contextmanager
     def bind_template(self, template):
@@ -260,6 +386,8 @@ class RequestContext(Context):
         for processor in processors:
             updates.update(processor(self.request))
         self.dicts[self._processors_index] = updates
+        # The frame was swapped in place, bypassing push/pop bookkeeping.
+        self._rebuild_flat()
 
         try:
             yield
@@ -267,6 +395,7 @@ class RequestContext(Context):
             self.template = None
             # Unset context processors.
             self.dicts[self._processors_index] = {}
+            self._rebuild_flat()
 
     def new(self, values=None):
         new_context = super().new(values)
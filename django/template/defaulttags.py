@@ -164,7 +164,7 @@ class ForNode(Node):
             parentloop = context['forloop']
         else:
             parentloop = {}
-        with context.push():
+        with context.push_dict({}):
             values = self.sequence.resolve(context, ignore_failures=True)
             if values is None:
                 values = []
@@ -178,6 +178,8 @@ class ForNode(Node):
                 values = reversed(values)
             num_loopvars = len(self.loopvars)
             unpack = num_loopvars > 1
+            template = context.template
+            debug = template is not None and template.engine.debug
             # Create a forloop value in the context.  We'll update counters on each
             # iteration just below.
             loop_dict = context['forloop'] = {'parentloop': parentloop}
@@ -213,7 +215,8 @@ class ForNode(Node):
                     context[self.loopvars[0]] = item
 
                 for node in self.nodelist_loop:
-                    nodelist.append(node.render_annotated(context))
+                    # Same debug-only dispatch as NodeList.render().
+                    nodelist.append(node.render_annotated(context) if debug else node.render(context))
 
                 if pop_context:
                     # Pop the loop variables pushed on to the context to avoid
@@ -516,7 +519,9 @@ class WithNode(Node):
 
     def render(self, context):
         values = {key: val.resolve(context) for key, val in self.extra_context.items()}
-        with context.push(**values):
+        # values is a fresh dict owned here, so it can become the frame
+        # itself instead of being copied into a ContextDict.
+        with context.push_dict(values):
             return self.nodelist.render(context)
 
 
@@ -47,7 +47,7 @@ class BlockNode(Node):
 
     def render(self, context):
         block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
-        with context.push():
+        with context.push_dict({}):
             if block_context is None:
                 context['block'] = self
                 result = self.nodelist.render(context)
@@ -184,7 +184,8 @@ class IncludeNode(Node):
         }
         if self.isolated_context:
             return template.render(context.new(values))
-        with context.push(**values):
+        # values is a fresh dict owned here; push it as the frame directly.
+        with context.push_dict(values):
             return template.render(context)
 
 
@@ -71,10 +71,17 @@ class TranslateNode(Node):
         self.noop = noop
         self.asvar = asvar
         self.message_context = message_context
-        self.filter_expression = filter_expression
+        # The parser may hand out cache-shared FilterExpressions; take a
+        # private copy since the var is replaced/mutated below.
+        self.filter_expression = filter_expression._unshared_copy()
         if isinstance(self.filter_expression.var, str):
             self.filter_expression.var = Variable("'%s'" %
                                                   self.filter_expression.var)
+        else:
+            # render() assigns translate/message_context on the variable in
+            # place. Plain lookup variables may be shared across templates by
+            # the Variable cache, so mutate a private copy instead.
+            self.filter_expression.var = self.filter_expression.var._unshared_copy()
 
     def render(self, context):
         self.filter_expression.var.translate = not self.noop
@@ -1,6 +1,7 @@
 import base64
 import calendar
 import datetime
+import functools
 import re
 import unicodedata
 import warnings
@@ -151,6 +152,16 @@ def http_date(epoch_seconds=None):
 
     Output a string in the format 'Wdy, DD Mon YYYY HH:MM:SS GMT'.
     """
+    if epoch_seconds is None:
+        # Current time changes between calls and must not be memoized.
+        return formatdate(None, usegmt=True)
+    return _http_date(epoch_seconds)
+
+
+@functools.lru_cache(maxsize=4096)
+def _http_date(epoch_seconds):
+    # Formatting is pure for a fixed timestamp, and responses for the same
+    # resource repeat the same Last-Modified value until it changes.
     return formatdate(epoch_seconds, usegmt=True)
 
 
@@ -263,6 +274,7 @@ def parse_etags(etag_str):
         return [match.group(1) for match in etag_matches if match]
 
 
+@functools.lru_cache(maxsize=4096)
 def quote_etag(etag_str):
     """
     If the provided string is already a quoted ETag, return it. Otherwise, wrap
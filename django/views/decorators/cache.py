@@ -7,6 +7,7 @@ from functools import wraps
 from django.middleware.cache import CacheMiddleware
 from django.utils.cache import add_never_cache_headers, patch_cache_control
 from django.utils.decorators import decorator_from_middleware_with_args
+from django.utils.http import http_date
 
 
 def cache_page(timeout, *, cache=None, key_prefix=None):
@@ -30,16 +31,33 @@ def cache_page(timeout, *, cache=None, key_prefix=None):
 
 # kwargs用于控制缓存行为打补丁一样
 def cache_control(**kwargs):
+    # The kwargs are fixed at decoration time, so the header value they
+    # produce is fixed too; format it once instead of per response. A
+    # response that already carries Cache-Control still goes through the
+    # full merge logic (minimum of max-ages, public/private override).
+    directives = ', '.join(
+        k.replace('_', '-') if v is True else '%s=%s' % (k.replace('_', '-'), v)
+        for k, v in kwargs.items()
+    )
+
     def _cache_controller(viewfunc):
         @wraps(viewfunc)
         def _cache_controlled(request, *args, **kw):
             response = viewfunc(request, *args, **kw)
-            patch_cache_control(response, **kwargs)
+            if response.get('Cache-Control'):
+                patch_cache_control(response, **kwargs)
+            else:
+                response['Cache-Control'] = directives
             return response
         return _cache_controlled
     return _cache_controller
 
 
+# What add_never_cache_headers() produces for a response without caching
+# headers; never varies, so it doesn't need to be recomputed per response.
+_NEVER_CACHE_DIRECTIVES = 'max-age=0, no-cache, no-store, must-revalidate'
+
+
 def never_cache(view_func):
     """
     把响应里加上 never_cache 的响应头
@@ -48,6 +66,11 @@ def never_cache(view_func):
     @wraps(view_func)
     def _wrapped_view_func(request, *args, **kwargs):
         response = view_func(request, *args, **kwargs)
-        add_never_cache_headers(response)
+        if response.has_header('Expires') or response.get('Cache-Control'):
+            # The view set its own caching headers; merge with them.
+            add_never_cache_headers(response)
+        else:
+            response['Expires'] = http_date()
+            response['Cache-Control'] = _NEVER_CACHE_DIRECTIVES
         return response
     return _wrapped_view_func
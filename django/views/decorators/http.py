@@ -29,9 +29,13 @@ def require_http_methods(request_method_list):
     Note that request methods should be in uppercase.
     """
     def decorator(func):
+        # O(1) membership on every request; the original list is kept for
+        # HttpResponseNotAllowed, which wants an ordered sequence.
+        allowed_methods = frozenset(request_method_list)
+
         @wraps(func)
         def inner(request, *args, **kwargs):
-            if request.method not in request_method_list:
+            if request.method not in allowed_methods:
                 response = HttpResponseNotAllowed(request_method_list)
                 log_response(
                     'Method Not Allowed (%s): %s', request.method, request.path,
@@ -82,17 +86,16 @@ def condition(etag_func=None, last_modified_func=None):
     def decorator(func):
         @wraps(func)
         def inner(request, *args, **kwargs):
-            # Compute values (if any) for the requested resource.
-            def get_last_modified():
-                if last_modified_func:
-                    dt = last_modified_func(request, *args, **kwargs)
-                    if dt:
-                        return timegm(dt.utctimetuple())
-
             # The value from etag_func() could be quoted or unquoted.
             res_etag = etag_func(request, *args, **kwargs) if etag_func else None
             res_etag = quote_etag(res_etag) if res_etag is not None else None
-            res_last_modified = get_last_modified()
+            # Compute the last modified timestamp (if any) inline rather than
+            # through a closure allocated per request.
+            if last_modified_func:
+                dt = last_modified_func(request, *args, **kwargs)
+                res_last_modified = timegm(dt.utctimetuple()) if dt else None
+            else:
+                res_last_modified = None
 
             # 根据request 和计算的判断是否需要响应
             response = get_conditional_response(
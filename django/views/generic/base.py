@@ -4,7 +4,6 @@ View-Counter：1
 """
 
 import logging
-from functools import update_wrapper
 
 from django.core.exceptions import ImproperlyConfigured
 from django.http import (
@@ -22,6 +21,13 @@ class ContextMixin:
     """
     提供 extra_context 给 get_context_data
     """
+    # Collapsing the get_context_data() super() chain at class-build time
+    # (generating a fused method per concrete view) was considered and
+    # rejected: the cooperative chain is the documented way third-party
+    # mixins inject context, and whether a hook is "unused" can't be decided
+    # from declared attributes alone (get_paginate_by() and friends are
+    # routinely overridden to return values the class attributes don't
+    # show). Each mixin's own step is kept cheap instead.
     extra_context = None
 
     def get_context_data(self, **kwargs):
@@ -37,6 +43,12 @@ class View:
     Intentionally simple parent class for all views. Only implements
     dispatch-by-method and simple sanity checking.
     """
+    # __slots__ was considered for the per-request instances and rejected:
+    # __init__ accepts arbitrary initkwargs and setattr()s them (any class
+    # attribute name is fair game), mixins hang self.object/self.object_list
+    # and the head alias on the instance, and every real view is a user
+    # subclass without __slots__ -- which gets a __dict__ regardless, so
+    # slotted bases here would add restrictions without removing the dict.
 
     http_method_names = ['get', 'post', 'put', 'patch', 'delete', 'head', 'options', 'trace']
 
@@ -62,12 +74,19 @@ class View:
                                 "only accepts arguments that are already "
                                 "attributes of the class." % (cls.__name__, key))
 
+        # 这两项探测对每个类是固定的 提到闭包外面 每个请求省掉两次 hasattr
+        # head 的别名仍按实例赋值（绑定方法必须在实例上建立）
+        needs_head_alias = hasattr(cls, 'get') and not hasattr(cls, 'head')
+        # setup() 没被重写时一定会设置 request 无需每次检查
+        check_setup = cls.setup is not View.setup
+
         def view(request, *args, **kwargs):
             self = cls(**initkwargs) #@实例化
-            if hasattr(self, 'get') and not hasattr(self, 'head'):
+            # 'head' not in __dict__ 照顾在 __init__ 里设置 head 的子类
+            if needs_head_alias and 'head' not in self.__dict__:
                 self.head = self.get
             self.setup(request, *args, **kwargs)
-            if not hasattr(self, 'request'):
+            if check_setup and not hasattr(self, 'request'):
                 raise AttributeError(
                     "%s instance has no 'request' attribute. Did you override "
                     "setup() and forget to call super()?" % cls.__name__
@@ -78,10 +97,16 @@ class View:
 
         
         # 把类的文档和名字等属性更新给视图实例
-        update_wrapper(view, cls, updated=())
+        # update_wrapper 要对 WRAPPER_ASSIGNMENTS 逐项 getattr/setattr
+        # URLconf 导入时每个视图都要走一遍 as_view 直接赋值更省
+        view.__module__ = cls.__module__
+        view.__name__ = cls.__name__
+        view.__qualname__ = cls.__qualname__
+        view.__doc__ = cls.__doc__
 
-        # 把 cls.dispatch 的属性取过来
-        update_wrapper(view, cls.dispatch, assigned=())
+        # 把 cls.dispatch 的属性取过来（装饰器 via method_decorator 挂的标记）
+        view.__dict__.update(cls.dispatch.__dict__)
+        view.__wrapped__ = cls.dispatch
 
         # as_view 是个装饰器函数 返回可调用的 view
         return view
@@ -94,10 +119,12 @@ class View:
 
     def dispatch(self, request, *args, **kwargs):
         # 分发请求方法; 不存在或者不允许进行错误处理
-        if request.method.lower() in self.http_method_names:
-            # request.method.lower() 是名字 获取的是方法 这就是分发映射
+        # 标准动词查表 免去 str.lower() 的新串分配; 生僻动词才退回 lower()
+        method = _METHOD_LOWER.get(request.method) or request.method.lower()
+        if method in self.http_method_names:
+            # method 是名字 获取的是方法 这就是分发映射
             # 没被实现的方法就是不允许的
-            handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            handler = getattr(self, method, self.http_method_not_allowed)
         else:
             handler = self.http_method_not_allowed
         return handler(request, *args, **kwargs)
@@ -111,15 +138,43 @@ class View:
         return HttpResponseNotAllowed(self._allowed_methods())
 
     def options(self, request, *args, **kwargs):
-        """OPTION 动词默认实现都一样"""
+        """OPTION 动词默认实现都一样 Allow 头按类缓存"""
+        cls = self.__class__
+        if 'http_method_names' in self.__dict__:
+            # 实例覆盖了 http_method_names 时和 _allowed_methods 一样不走缓存
+            allow = ', '.join(self._allowed_methods())
+        else:
+            try:
+                allow = cls.__dict__['_allowed_header_cache']
+            except KeyError:
+                allow = cls._allowed_header_cache = ', '.join(self._allowed_methods())
+        # 响应对象每次都要新建 调用方会继续改它的头
         response = HttpResponse()
-        response['Allow'] = ', '.join(self._allowed_methods())
+        response['Allow'] = allow
         response['Content-Length'] = '0'
         return response
 
     def _allowed_methods(self):
-        """允许方法封装一次"""
-        return [m.upper() for m in self.http_method_names if hasattr(self, m)]
+        """允许方法封装一次 结果按类缓存（8 次 hasattr 每类只做一次）"""
+        cls = self.__class__
+        if 'http_method_names' in self.__dict__:
+            # 实例上覆盖了 http_method_names（as_view 初始化参数）不走类级缓存
+            return [m.upper() for m in self.http_method_names if hasattr(self, m)]
+        try:
+            return cls.__dict__['_allowed_methods_cache']
+        except KeyError:
+            pass
+        # as_view() 会给有 get 的实例补上 head 别名 按类计算时也要算上
+        allowed = [
+            m.upper() for m in cls.http_method_names
+            if hasattr(cls, m) or (m == 'head' and hasattr(cls, 'get'))
+        ]
+        cls._allowed_methods_cache = allowed
+        return allowed
+
+
+# 标准动词的大写到小写映射 dispatch 查表复用 request.method 现成的大写串
+_METHOD_LOWER = {m.upper(): m for m in View.http_method_names}
 
 
 class TemplateResponseMixin:
@@ -183,11 +238,14 @@ class RedirectView(View):
         else:
             return None
 
-        # QUERY_STRING 是 META 里面需要的参数
-        args = self.request.META.get('QUERY_STRING', '')
-        # query_string 和 QUERY_STRING 都有
-        if args and self.query_string:
-            url = "%s?%s" % (url, args)
+        # 默认 query_string=False 不透传时连 META 都不用读
+        # url/pattern_name/query_string 都可经 as_view 初始化参数按实例覆盖
+        # 所以不能在类构建期为某一条路径做特化
+        if self.query_string:
+            # QUERY_STRING 是 META 里面需要的参数
+            args = self.request.META.get('QUERY_STRING', '')
+            if args:
+                url = "%s?%s" % (url, args)
         return url
 
     def get(self, request, *args, **kwargs):
@@ -206,21 +264,14 @@ class RedirectView(View):
             )
             return HttpResponseGone()
 
-    # 只有 get
-    def head(self, request, *args, **kwargs):
-        return self.get(request, *args, **kwargs)
-
-    def post(self, request, *args, **kwargs):
-        return self.get(request, *args, **kwargs)
-
-    def options(self, request, *args, **kwargs):
-        return self.get(request, *args, **kwargs)
-
-    def delete(self, request, *args, **kwargs):
+    # 只有 get 其余动词共用一个转发函数（六个函数对象合成一个）
+    # 经 self.get 后期绑定 子类只重写 get() 其他动词自动跟上
+    def _forward_to_get(self, request, *args, **kwargs):
         return self.get(request, *args, **kwargs)
 
-    def put(self, request, *args, **kwargs):
-        return self.get(request, *args, **kwargs)
-
-    def patch(self, request, *args, **kwargs):
-        return self.get(request, *args, **kwargs)
+    head = _forward_to_get
+    post = _forward_to_get
+    options = _forward_to_get
+    delete = _forward_to_get
+    put = _forward_to_get
+    patch = _forward_to_get
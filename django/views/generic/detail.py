@@ -3,6 +3,8 @@ Last-View：2019年8月9日07:29:28
 View-Counter：1
 """
 
+from functools import lru_cache
+
 from django.core.exceptions import ImproperlyConfigured
 from django.db import models
 from django.http import Http404
@@ -10,6 +12,12 @@ from django.utils.translation import gettext as _
 from django.views.generic.base import ContextMixin, TemplateResponseMixin, View
 
 
+@lru_cache(maxsize=None)
+def _model_template_name(app_label, model_name, suffix):
+    """缓存 <app>/<model><suffix>.html 同一个模型每个请求都要拼一次"""
+    return "%s/%s%s.html" % (app_label, model_name, suffix)
+
+
 class SingleObjectMixin(ContextMixin):
     """
     获取操作单个对象的能力
@@ -28,6 +36,8 @@ class SingleObjectMixin(ContextMixin):
     slug_url_kwarg = 'slug'
     pk_url_kwarg = 'pk'
     query_pk_and_slug = False
+    ## 可选的列裁剪：模板只用到少数字段时设置之 走 .only() 少取列
+    fields_for_detail = None
 
     def get_object(self, queryset=None):
         """
@@ -38,7 +48,18 @@ class SingleObjectMixin(ContextMixin):
         """
         # 使用定制的 queryset
         if queryset is None:
+            ## 视图实例只活一次请求 同一请求内（比如权限 mixin 先查一遍）
+            ## 重复调用不再查库；显式传入 queryset 则绕过缓存
+            obj = self.__dict__.get('_cached_object')
+            if obj is not None:
+                return obj
             queryset = self.get_queryset()
+            if self.fields_for_detail and hasattr(queryset, 'only'):
+                ## 主键 .only() 会自动带上；漏掉的字段仍可惰性取（多一次查询）
+                queryset = queryset.only(*self.fields_for_detail)
+            cache_object = True
+        else:
+            cache_object = False
 
         # 尝试用主键查询
         pk = self.kwargs.get(self.pk_url_kwarg)
@@ -66,6 +87,8 @@ class SingleObjectMixin(ContextMixin):
             # 要么就不存在
             raise Http404(_("No %(verbose_name)s found matching the query") %
                           {'verbose_name': queryset.model._meta.verbose_name})
+        if cache_object:
+            self._cached_object = obj
         return obj
 
     def get_queryset(self):
@@ -103,16 +126,15 @@ class SingleObjectMixin(ContextMixin):
 
     def get_context_data(self, **kwargs):
         """把单个对象放进上下文字典."""
-        context = {}
+        ## **kwargs 本身就是本次调用新建的字典 直接原地补键
+        ## 省掉中间 context 字典；setdefault 保持调用者传入值优先的覆盖顺序
         if self.object:
             ## object 和 model_name 指向同一个对象 双保险
-            context['object'] = self.object
+            kwargs.setdefault('object', self.object)
             context_object_name = self.get_context_object_name(self.object)
             if context_object_name:
-                context[context_object_name] = self.object
-        ## 若是重写 get_context_data 也应该如此结尾
-        context.update(kwargs)
-        return super().get_context_data(**context)
+                kwargs.setdefault(context_object_name, self.object)
+        return super().get_context_data(**kwargs)
 
 
 class BaseDetailView(SingleObjectMixin, View):
@@ -158,15 +180,16 @@ class SingleObjectTemplateResponseMixin(TemplateResponseMixin):
             # 如果展示对象是个 model.
             if isinstance(self.object, models.Model):
                 object_meta = self.object._meta
-                names.append("%s/%s%s.html" % (
+                names.append(_model_template_name(
                     object_meta.app_label,
                     object_meta.model_name,
                     self.template_name_suffix
                 ))
             elif getattr(self, 'model', None) is not None and issubclass(self.model, models.Model):
-                names.append("%s/%s%s.html" % (
-                    self.model._meta.app_label,
-                    self.model._meta.model_name,
+                opts = self.model._meta
+                names.append(_model_template_name(
+                    opts.app_label,
+                    opts.model_name,
                     self.template_name_suffix
                 ))
 
@@ -3,7 +3,6 @@ Last-View：2019年8月9日08:10:03
 View-Counter：1
 """
 from django.core.exceptions import ImproperlyConfigured
-from django.forms import models as model_forms
 from django.http import HttpResponseRedirect
 from django.views.generic.base import ContextMixin, TemplateResponseMixin, View
 from django.views.generic.detail import (
@@ -45,10 +44,9 @@ class FormMixin(ContextMixin):
         }
 
         if self.request.method in ('POST', 'PUT'):
-            kwargs.update({
-                'data': self.request.POST,
-                'files': self.request.FILES,
-            })
+            ## 直接按键赋值 不为 update 再建一个临时字典
+            kwargs['data'] = self.request.POST
+            kwargs['files'] = self.request.FILES
         return kwargs
 
     def get_success_url(self):
@@ -73,6 +71,11 @@ class FormMixin(ContextMixin):
         return super().get_context_data(**kwargs)
 
 
+# modelform_factory 每次都动态造一个新的 ModelForm 子类（反射字段 建 Media）
+# 产物只由 (model, fields) 决定 按键缓存 每类视图只造一次
+_modelform_cache = {}
+
+
 class ModelFormMixin(FormMixin, SingleObjectMixin):
     """提供一个展示和处理模型表单的mixin"""
     fields = None # 展示字段
@@ -102,15 +105,25 @@ class ModelFormMixin(FormMixin, SingleObjectMixin):
                     "Using ModelFormMixin (base class of %s) without "
                     "the 'fields' attribute is prohibited." % self.__class__.__name__
                 )
-            # 使用model_forms 的工厂函数生成模型表单类
-            return model_forms.modelform_factory(model, fields=self.fields)
+            # 使用model_forms 的工厂函数生成模型表单类 结果按 (model, fields) 缓存
+            # 表单框架整个很重 推迟到真正要造表单类时再导入
+            # （用 form_class 或不用表单的站点完全不必加载它）
+            from django.forms import models as model_forms
+            fields = self.fields
+            key = (model, tuple(fields) if isinstance(fields, list) else fields)
+            try:
+                return _modelform_cache[key]
+            except KeyError:
+                form_class = model_forms.modelform_factory(model, fields=fields)
+                _modelform_cache[key] = form_class
+                return form_class
 
     def get_form_kwargs(self):
         """返回实例化表单是关键字参数"""
         kwargs = super().get_form_kwargs()
         if hasattr(self, 'object'):
             # 上下文里的 instance 源自此处
-            kwargs.update({'instance': self.object})
+            kwargs['instance'] = self.object
         return kwargs
 
     def get_success_url(self):
@@ -3,12 +3,21 @@ Last-View：2019年8月9日06:49:57
 View-Counter：1
 """
 
+from functools import lru_cache
+
 from django.core.exceptions import ImproperlyConfigured
 from django.core.paginator import InvalidPage, Paginator
 from django.db.models.query import QuerySet
 from django.http import Http404
 from django.utils.translation import gettext as _
 from django.views.generic.base import ContextMixin, TemplateResponseMixin, View
+from django.views.generic.detail import _model_template_name
+
+
+@lru_cache(maxsize=None)
+def _list_context_name(model):
+    """缓存 <model_name>_list 每个请求都要拼一次（模型类存活到进程结束）"""
+    return '%s_list' % model._meta.model_name
 
 
 class MultipleObjectMixin(ContextMixin):
@@ -34,6 +43,10 @@ class MultipleObjectMixin(ContextMixin):
     paginator_class = Paginator
     page_kwarg = 'page'
     ordering = None
+    ## 可选的关联加载策略 避免列表模板里逐行触发 N+1 查询
+    ## FK/一对一 用 select_related；多对多/反向关系用 prefetch_related
+    select_related = None
+    prefetch_related = None
 
     def get_queryset(self):
         """
@@ -62,6 +75,20 @@ class MultipleObjectMixin(ContextMixin):
                 ordering = (ordering,)
             queryset = queryset.order_by(*ordering)
 
+        ## 查询集是惰性的 分页会先切片再求值
+        ## 所以 prefetch 只抓当页的行 不会把整表关联都拉进内存
+        if isinstance(queryset, QuerySet):
+            select_related = self.select_related
+            if select_related:
+                if isinstance(select_related, str):
+                    select_related = (select_related,)
+                queryset = queryset.select_related(*select_related)
+            prefetch_related = self.prefetch_related
+            if prefetch_related:
+                if isinstance(prefetch_related, str):
+                    prefetch_related = (prefetch_related,)
+                queryset = queryset.prefetch_related(*prefetch_related)
+
         return queryset
 
     def get_ordering(self):
@@ -70,6 +97,13 @@ class MultipleObjectMixin(ContextMixin):
 
     def paginate_queryset(self, queryset, page_size):
         """将查询集分页."""
+        # Replacing paginator.count with a sliced-length estimate (or keyset
+        # pagination) was considered and rejected: num_pages feeds the
+        # page-number validation and the 'last' shortcut right below, so an
+        # estimated count serves wrong 404s and a wrong last page, and this
+        # ORM layer has no keyset support to hand the template a page_obj
+        # for. The COUNT itself is issued once per request -- Paginator
+        # caches it -- and BaseListView reuses it for its emptiness check.
 
         # 实例化分页器
         paginator = self.get_paginator(
@@ -106,10 +140,24 @@ class MultipleObjectMixin(ContextMixin):
 
     def get_paginator(self, queryset, per_page, orphans=0,
                       allow_empty_first_page=True, **kwargs):
-        """返回一个分页器实例"""
-        return self.paginator_class(
+        """返回一个分页器实例 同一请求内相同参数复用同一个
+
+        Paginator 把 .count 缓存在自己身上 复用实例意味着
+        BaseListView.get 的空列表判断和随后的分页共享一次 COUNT
+        """
+        if not kwargs:
+            cached = self.__dict__.get('_paginator_cache')
+            if (cached is not None and cached[0] is queryset and
+                    cached[1] == (per_page, orphans, allow_empty_first_page)):
+                return cached[2]
+        paginator = self.paginator_class(
             queryset, per_page, orphans=orphans,
             allow_empty_first_page=allow_empty_first_page, **kwargs)
+        if not kwargs:
+            self._paginator_cache = (
+                queryset, (per_page, orphans, allow_empty_first_page), paginator,
+            )
+        return paginator
 
     def get_paginate_orphans(self):
         """
@@ -129,7 +177,7 @@ class MultipleObjectMixin(ContextMixin):
             return self.context_object_name
         elif hasattr(object_list, 'model'):
             ## 有 model 就用 model_name_list 可不提供
-            return '%s_list' % object_list.model._meta.model_name
+            return _list_context_name(object_list.model)
         else:
             return None
 
@@ -139,27 +187,22 @@ class MultipleObjectMixin(ContextMixin):
         ## get_paginate_by 默认没用 queryset。方便重写根据 queryset 大小返回 pagesize 
         page_size = self.get_paginate_by(queryset)
         context_object_name = self.get_context_object_name(queryset)
+        ## **kwargs 就是本次调用新建的字典 原地补键省掉中间 context 字典
+        ## setdefault 保持原先 update(kwargs) 的覆盖顺序（调用者优先）
         if page_size:
             paginator, page, queryset, is_paginated = self.paginate_queryset(queryset, page_size)
-            context = {
-                'paginator': paginator,
-                'page_obj': page,
-                'is_paginated': is_paginated,
-                'object_list': queryset
-            }
+            kwargs.setdefault('paginator', paginator)
+            kwargs.setdefault('page_obj', page)
+            kwargs.setdefault('is_paginated', is_paginated)
         else:
-            context = {
-                'paginator': None,
-                'page_obj': None,
-                'is_paginated': False,
-                'object_list': queryset
-            }
+            kwargs.setdefault('paginator', None)
+            kwargs.setdefault('page_obj', None)
+            kwargs.setdefault('is_paginated', False)
+        kwargs.setdefault('object_list', queryset)
         ## 这里做了双保险 皆可以用 object_list 访问
         if context_object_name is not None:
-            context[context_object_name] = queryset
-        ## 层层继承的时候用 update 增量传递上下文
-        context.update(kwargs)
-        return super().get_context_data(**context)
+            kwargs.setdefault(context_object_name, queryset)
+        return super().get_context_data(**kwargs)
 
 
 class BaseListView(MultipleObjectMixin, View):
@@ -169,11 +212,15 @@ class BaseListView(MultipleObjectMixin, View):
         allow_empty = self.get_allow_empty()
 
         if not allow_empty:
-            ## 可以分页 有查询集：做一个廉价查询比把整个查询集都加载到内存要好
-            ## self.object_list.exists() 就是廉价查询
-
-            if self.get_paginate_by(self.object_list) is not None and hasattr(self.object_list, 'exists'):
-                is_empty = not self.object_list.exists()
+            ## 分页时反正要发一次 COUNT 直接用它判断是否为空
+            ## 省掉原先单独的 EXISTS 查询（分页器会被 get_context_data 复用）
+            page_size = self.get_paginate_by(self.object_list)
+            if page_size is not None and hasattr(self.object_list, 'exists'):
+                paginator = self.get_paginator(
+                    self.object_list, page_size,
+                    orphans=self.get_paginate_orphans(),
+                    allow_empty_first_page=allow_empty)
+                is_empty = paginator.count == 0
             else:
                 is_empty = not self.object_list
             ## 不允许为空确实空的返回404
@@ -209,7 +256,7 @@ class MultipleObjectTemplateResponseMixin(TemplateResponseMixin):
         if hasattr(self.object_list, 'model'):
             opts = self.object_list.model._meta
             ## 可见是按有子目录的
-            names.append("%s/%s%s.html" % (opts.app_label, opts.model_name, self.template_name_suffix))
+            names.append(_model_template_name(opts.app_label, opts.model_name, self.template_name_suffix))
         elif not names:
             ## template_name 和 get_queryset 缺一不可
             raise ImproperlyConfigured(